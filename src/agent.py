@@ -4,223 +4,174 @@ This module implements the main agent workflow using LangGraph
 for generating Figma-compatible UI layouts from natural language.
 """
 
-import json
+import asyncio
+import operator
 from typing import Any, Dict, List, TypedDict, Annotated
 
 from langchain_core.messages import SystemMessage, HumanMessage
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import END, StateGraph
+from pydantic import BaseModel, Field
 
+from cache import response_cache
 from config import config
-from llm import llm_provider
+from llm import llm_provider, llm_semaphore, FigmaComponent
 from figma_api import figma_api
 
 
-# Define the state schema for our agent
-class AgentState(TypedDict):
-    """State schema for the UI generation agent."""
+# Static prompt text, built once at import. Only the user prompt varies
+# per call, so it is appended at the tail of the instruction block.
+_UI_SYSTEM_PROMPT = (
+    "You are an expert UI/UX designer creating Figma-compatible layouts. "
+    "You work in three stages within a single response: extract requirements, "
+    "generate a layout, then refine it for Figma compatibility."
+)
 
-    # Input state
-    prompt: str
+_UI_INSTRUCTIONS = """Work through three stages and return one JSON object with the keys "requirements", "layout", and "refined_layout".
 
-    # Processing state
-    parsed_requirements: Dict[str, Any]
-    layout_structure: Dict[str, Any]
+STAGE 1 - requirements: extract the layout type (dashboard, form, landing page, etc.), key components, style preferences (colors, themes), responsive design needs, and any specific functionality from the user prompt.
 
-    # Output state
-    final_layout: Dict[str, Any]
-    figma_response: Dict[str, Any]
+STAGE 2 - layout: create a detailed, hierarchical UI layout satisfying all requirements, with styling information (colors, spacing, fonts) and standard Figma component terminology.
 
-    # Metadata and control
-    errors: List[str]
-    messages: List[Any]
-    status: str
+STAGE 3 - refined_layout: correct the stage 2 layout for Figma compatibility: valid Figma component types (FRAME, TEXT, RECTANGLE, etc.), all required properties per component type, valid color values, positions and dimensions, and proper parent-child relationships. Repeat the stage 2 layout unchanged if it is already valid.
 
+Respond with only the JSON object, no explanations or other text.
 
-# Define the nodes in our graph
-
-def parse_requirements(state: AgentState) -> AgentState:
-    """Parse the user prompt to extract requirements for the UI layout."""
-    prompt = state["prompt"]
-    print(f"Parsing requirements from prompt: {prompt}")
+USER PROMPT: """
 
-    # Use the LLM to extract structured requirements from the prompt
-    requirement_prompt = ChatPromptTemplate.from_messages([
-        SystemMessage(content="You are an expert UI/UX designer. Extract structured requirements from the user's prompt."),
-        HumanMessage(content=f"""
-            Extract the key UI requirements from this description. Focus on:
-            1. Layout type (dashboard, form, landing page, etc.)
-            2. Key components needed
-            3. Style preferences (colors, themes)
-            4. Responsive design requirements
-            5. Any specific functionality mentioned
+# The system message never changes, so construct it once at import;
+# only the trailing HumanMessage is built per call
+_UI_SYSTEM_MESSAGE = SystemMessage(content=_UI_SYSTEM_PROMPT)
 
-            USER PROMPT: {prompt}
-
-            Format your response as JSON with appropriate keys and values.
-        """)
-    ])
-
-    try:
-        result = llm_provider.llm.invoke(requirement_prompt)
-        content = result.content
 
-        # Extract JSON from the response
-        import re
-        json_pattern = r'```json\s*([\s\S]*?)\s*```'
-        json_match = re.search(json_pattern, content)
+class UIGenerationResult(BaseModel):
+    """Structured response schema for the fused generate_ui call."""
 
-        if json_match:
-            json_str = json_match.group(1)
-        else:
-            json_str = content
-
-        requirements = json.loads(json_str)
-
-        return {
-            **state,
-            "parsed_requirements": requirements,
-            "messages": state["messages"] + [{"role": "system", "content": "Requirements extracted successfully."}],
-            "status": "requirements_parsed"
-        }
-    except Exception as e:
-        error_msg = f"Error parsing requirements: {str(e)}"
-        return {
-            **state,
-            "errors": state["errors"] + [error_msg],
-            "messages": state["messages"] + [{"role": "system", "content": error_msg}],
-            "status": "error"
-        }
+    requirements: Dict[str, Any] = Field(default_factory=dict)
+    layout: FigmaComponent
+    refined_layout: FigmaComponent
 
 
-def generate_layout(state: AgentState) -> AgentState:
-    """Generate the UI layout based on parsed requirements."""
-    prompt = state["prompt"]
-    requirements = state["parsed_requirements"]
+# Structured-output runnable built once at import; include_raw keeps the
+# AIMessage so prompt-cache usage can still be logged
+_structured_ui_llm = llm_provider.llm.with_structured_output(
+    UIGenerationResult, include_raw=True
+)
 
-    # We'll use our LLM provider to generate the layout
-    try:
-        # Convert requirements back to text to include in the prompt
-        req_text = "\n".join([f"- {k}: {v}" for k, v in requirements.items()])
 
-        # Construct a richer prompt using the extracted requirements
-        enriched_prompt = f"""
-            {prompt}
+# Define the state schema for our agent
+class AgentState(TypedDict):
+    """State schema for the UI generation agent."""
 
-            Based on these requirements:
-            {req_text}
+    # Input state
+    prompt: str
 
-            Create a detailed UI layout that satisfies all requirements.
-        """
+    # Processing state
+    parsed_requirements: Dict[str, Any]
+    layout_structure: Dict[str, Any]
 
-        # Generate the layout using our LLM provider
-        layout_data = llm_provider.generate_ui_layout(enriched_prompt)
+    # Output state
+    final_layout: Dict[str, Any]
+    figma_response: Dict[str, Any]
 
-        return {
-            **state,
-            "layout_structure": layout_data,
-            "messages": state["messages"] + [{"role": "system", "content": "UI layout structure generated."}],
-            "status": "layout_generated"
-        }
-    except Exception as e:
-        error_msg = f"Error generating layout: {str(e)}"
-        return {
-            **state,
-            "errors": state["errors"] + [error_msg],
-            "messages": state["messages"] + [{"role": "system", "content": error_msg}],
-            "status": "error"
-        }
+    # Metadata and control; list fields use an append reducer so nodes
+    # return only new entries instead of copying the whole list
+    errors: Annotated[List[str], operator.add]
+    messages: Annotated[List[Any], operator.add]
+    status: str
 
 
-def refine_layout(state: AgentState) -> AgentState:
-    """Refine the generated layout to ensure Figma compatibility."""
-    layout_data = state["layout_structure"]
+# Define the nodes in our graph
 
-    # Use the LLM to check and refine the layout for Figma compatibility
-    refine_prompt = ChatPromptTemplate.from_messages([
-        SystemMessage(content="You are an expert Figma designer. Check and refine the layout to ensure Figma compatibility."),
-        HumanMessage(content=f"""
-            Check this UI layout structure for Figma compatibility:
+async def generate_ui(state: AgentState) -> Dict[str, Any]:
+    """Parse requirements, generate the layout, and refine it in one LLM call.
 
-            ```json
-            {json.dumps(layout_data, indent=2)}
-            ```
+    The previous workflow issued three sequential client->LLM round trips
+    (parse_requirements -> generate_layout -> refine_layout), each blocking
+    on network latency. The three steps form a strict dependency chain, so
+    instead of three round trips we send one multi-section prompt and have
+    the model emit all three stages in a single structured response.
 
-            Make sure it:
-            1. Uses correct Figma component types (FRAME, TEXT, RECTANGLE, etc.)
-            2. Has all required properties for each component type
-            3. Has valid color values, positions, and dimensions
-            4. Maintains proper parent-child relationships
+    The requirement facets (layout type, components, style, responsiveness,
+    functionality) are deliberately kept inside this one completion rather
+    than fanned out as parallel per-facet calls: they no longer gate the
+    layout, and separate calls would reintroduce the round trips this
+    fusion removed.
+    """
+    prompt = state["prompt"]
+    print(f"Generating UI from prompt: {prompt}")
 
-            Return the refined JSON structure only. If no changes are needed, return the original.
-        """)
-    ])
+    # The static instruction block leads and the dynamic user prompt sits
+    # strictly at the tail, so the provider's prompt-prefix cache sees an
+    # identical (cacheable) prefix on every invocation.
+    ui_prompt = [
+        _UI_SYSTEM_MESSAGE,
+        HumanMessage(content=_UI_INSTRUCTIONS + prompt)
+    ]
 
     try:
-        result = llm_provider.llm.invoke(refine_prompt)
-        content = result.content
-
-        # Extract JSON from the response
-        import re
-        json_pattern = r'```json\s*([\s\S]*?)\s*```'
-        json_match = re.search(json_pattern, content)
+        # Schema-constrained decoding: the model emits a parsed
+        # UIGenerationResult, so invalid JSON cannot occur. The semaphore
+        # is taken per call, so batch fan-out stays bounded too.
+        async with llm_semaphore:
+            result = await _structured_ui_llm.ainvoke(ui_prompt)
+        llm_provider.log_cache_usage(result["raw"])
 
-        if json_match:
-            json_str = json_match.group(1)
-        else:
-            json_str = content
+        response = result["parsed"]
+        if response is None:
+            raise ValueError(f"Unparseable structured response: {result.get('parsing_error')}")
 
-        refined_layout = json.loads(json_str)
+        requirements = response.requirements
+        layout_structure = response.layout.model_dump(exclude_none=True)
+        refined_layout = response.refined_layout.model_dump(exclude_none=True)
 
         return {
-            **state,
+            "parsed_requirements": requirements,
+            "layout_structure": layout_structure,
             "final_layout": refined_layout,
-            "messages": state["messages"] + [{"role": "system", "content": "UI layout refined for Figma compatibility."}],
+            "messages": [{"role": "system", "content": "UI layout generated and refined."}],
             "status": "layout_refined"
         }
     except Exception as e:
-        error_msg = f"Error refining layout: {str(e)}"
+        error_msg = f"Error generating layout: {str(e)}"
         return {
-            **state,
-            "errors": state["errors"] + [error_msg],
-            "messages": state["messages"] + [{"role": "system", "content": error_msg}],
-            "final_layout": layout_data,  # Use the unrefined layout
-            "status": "partial_success"
+            "errors": [error_msg],
+            "messages": [{"role": "system", "content": error_msg}],
+            "status": "error"
         }
 
 
-def export_to_figma(state: AgentState) -> AgentState:
+async def export_to_figma(state: AgentState) -> Dict[str, Any]:
     """Export the final layout to Figma if integration is enabled."""
     layout_data = state["final_layout"]
 
     # Skip if Figma integration is not enabled
     if not figma_api.is_enabled():
         return {
-            **state,
             "figma_response": {"status": "skipped", "message": "Figma integration not enabled"},
-            "messages": state["messages"] + [{"role": "system", "content": "Figma export skipped (integration not enabled)."}],
+            "messages": [{"role": "system", "content": "Figma export skipped (integration not enabled)."}],
             "status": "completed"
         }
 
     # Export to Figma
     try:
         layout_name = layout_data.get("name", "Generated UI Layout")
-        figma_response = figma_api.create_frame(layout_name, layout_data)
+        # The Figma client is synchronous; run it in a thread so the
+        # event loop keeps serving other in-flight requests
+        figma_response = await asyncio.to_thread(
+            figma_api.create_frame, layout_name, layout_data
+        )
 
         return {
-            **state,
             "figma_response": figma_response,
-            "messages": state["messages"] + [{"role": "system", "content": "Layout exported to Figma successfully."}],
+            "messages": [{"role": "system", "content": "Layout exported to Figma successfully."}],
             "status": "completed"
         }
     except Exception as e:
         error_msg = f"Error exporting to Figma: {str(e)}"
         return {
-            **state,
-            "errors": state["errors"] + [error_msg],
+            "errors": [error_msg],
             "figma_response": {"status": "error", "message": str(e)},
-            "messages": state["messages"] + [{"role": "system", "content": error_msg}],
+            "messages": [{"role": "system", "content": error_msg}],
             "status": "completed_with_errors"
         }
 
@@ -239,22 +190,18 @@ def should_export_to_figma(state: AgentState) -> str:
 
 
 # Build the agent graph
-def build_agent() :
+def build_agent():
     """Build the LangGraph workflow for the UI generation agent."""
     # Create a new graph
     workflow = StateGraph(AgentState)
 
     # Add nodes to the graph
-    workflow.add_node("parse_requirements", parse_requirements)
-    workflow.add_node("generate_layout", generate_layout)
-    workflow.add_node("refine_layout", refine_layout)
+    workflow.add_node("generate_ui", generate_ui)
     workflow.add_node("export_to_figma", export_to_figma)
 
     # Connect the nodes
-    workflow.add_edge("parse_requirements", "generate_layout")
-    workflow.add_edge("generate_layout", "refine_layout")
     workflow.add_conditional_edges(
-        "refine_layout",
+        "generate_ui",
         should_export_to_figma,
         {
             "export_to_figma": "export_to_figma",
@@ -264,28 +211,20 @@ def build_agent() :
     workflow.add_edge("export_to_figma", END)
 
     # Set the entry point
-    workflow.set_entry_point("parse_requirements")
+    workflow.set_entry_point("generate_ui")
 
-    # Compile the graph
+    # Compile the graph. No checkpointer: every node converts failures
+    # into a completed error state, so a run never leaves an interrupted
+    # checkpoint to resume from and retained state would be dead weight.
     return workflow.compile()
 
 
-# Create the agent with a memory saver for checkpointing
-memory = MemorySaver()
 ui_agent = build_agent()
 
 
-def generate_ui_from_prompt(prompt: str) -> Dict[str, Any]:
-    """Generate a UI layout from a natural language prompt.
-
-    Args:
-        prompt: Natural language description of the desired UI layout
-
-    Returns:
-        Dictionary containing the generated layout and process information
-    """
-    # Initialize the agent state
-    initial_state: AgentState = {
+def _initial_state(prompt: str) -> AgentState:
+    """Build the initial agent state for a prompt."""
+    return {
         "prompt": prompt,
         "parsed_requirements": {},
         "layout_structure": {},
@@ -297,14 +236,62 @@ def generate_ui_from_prompt(prompt: str) -> Dict[str, Any]:
     }
 
 
-    # Run the agent
-    result = ui_agent.invoke(initial_state)
-
-    # Return a simplified response
-    return {
+def _simplify_result(prompt: str, result: AgentState) -> Dict[str, Any]:
+    """Reduce the final agent state to the response dict, caching successes."""
+    response = {
         "status": result["status"],
         "layout": result["final_layout"],
         "figma_response": result["figma_response"],
         "errors": result["errors"],
         "messages": result["messages"],
     }
+
+    # Only cache successful generations so failures are retried
+    if result["final_layout"] and not result["errors"]:
+        response_cache.put(prompt, response)
+
+    return response
+
+
+async def generate_ui_from_prompt(prompt: str) -> Dict[str, Any]:
+    """Generate a UI layout from a natural language prompt.
+
+    Args:
+        prompt: Natural language description of the desired UI layout
+
+    Returns:
+        Dictionary containing the generated layout and process information
+    """
+    # Serve repeated prompts from the cache instead of re-running the workflow
+    cached = response_cache.get(prompt)
+    if cached is not None:
+        return cached
+
+    # Run the agent
+    result = await ui_agent.ainvoke(_initial_state(prompt))
+
+    return _simplify_result(prompt, result)
+
+
+async def generate_ui_from_prompts(prompts: List[str]) -> List[Dict[str, Any]]:
+    """Generate UI layouts for several prompts concurrently.
+
+    Each prompt runs through its own agent invocation, but the runs are
+    dispatched together with asyncio.gather so their LLM round trips
+    overlap instead of executing back to back.
+
+    Args:
+        prompts: Natural language descriptions of the desired UI layouts
+
+    Returns:
+        One response dictionary per prompt, in input order
+    """
+    async def run_one(prompt: str) -> Dict[str, Any]:
+        cached = response_cache.get(prompt)
+        if cached is not None:
+            return cached
+
+        result = await ui_agent.ainvoke(_initial_state(prompt))
+        return _simplify_result(prompt, result)
+
+    return await asyncio.gather(*(run_one(prompt) for prompt in prompts))
@@ -4,13 +4,19 @@ This module implements a FastAPI server to expose the AI agent's
 functionality through a REST API.
 """
 
-from typing import Dict, Any, Optional
+import os
+import sys
+from typing import Dict, Any, List, Optional
+
+import orjson
 
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-from agent import generate_ui_from_prompt
+from agent import generate_ui_from_prompt, generate_ui_from_prompts
 from config import config
+from llm import llm_provider
 
 
 # Define request and response models
@@ -26,6 +32,15 @@ class UIResponse(BaseModel):
     errors: list
     figma_url: Optional[str] = None
 
+class BatchUIRequest(BaseModel):
+    """Model for batch UI generation request."""
+    prompts: List[str]
+    options: Optional[Dict[str, Any]] = None
+
+class BatchUIResponse(BaseModel):
+    """Model for batch UI generation response."""
+    results: List[UIResponse]
+
 # Create the FastAPI app
 app = FastAPI(
     title="AI UI Generator",
@@ -33,6 +48,29 @@ app = FastAPI(
     version="0.1.0",
 )
 
+@app.on_event("startup")
+async def warmup_llm() -> None:
+    """Prime the LLM connection so the first request skips the cold start."""
+    await llm_provider.warmup()
+
+def _to_response(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape an agent result into the UIResponse fields."""
+    # Extract Figma URL if available
+    figma_url = None
+    if (
+        result.get("figma_response")
+        and isinstance(result["figma_response"], dict)
+        and result["figma_response"].get("url")
+    ):
+        figma_url = result["figma_response"]["url"]
+
+    return {
+        "status": result.get("status", "unknown"),
+        "layout": result.get("layout", {}),
+        "errors": result.get("errors", []),
+        "figma_url": figma_url,
+    }
+
 @app.post("/generate", response_model=UIResponse)
 async def generate_ui(request: UIRequest) -> Dict[str, Any]:
     """Generate a UI layout from a natural language prompt.
@@ -45,29 +83,60 @@ async def generate_ui(request: UIRequest) -> Dict[str, Any]:
     """
     try:
         # Generate UI layout
-        result = generate_ui_from_prompt(request.prompt)
-
-        # Extract Figma URL if available
-        figma_url = None
-        if (
-            result.get("figma_response")
-            and isinstance(result["figma_response"], dict)
-            and result["figma_response"].get("url")
-        ):
-            figma_url = result["figma_response"]["url"]
-
-        return {
-            "status": result.get("status", "unknown"),
-            "layout": result.get("layout", {}),
-            "errors": result.get("errors", []),
-            "figma_url": figma_url,
-        }
+        result = await generate_ui_from_prompt(request.prompt)
+
+        return _to_response(result)
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error generating UI layout: {str(e)}"
         )
 
+@app.post("/generate_batch", response_model=BatchUIResponse)
+async def generate_ui_batch(request: BatchUIRequest) -> Dict[str, Any]:
+    """Generate UI layouts for a batch of prompts.
+
+    The prompts run concurrently through the agent, so a batch of N
+    completes in roughly the time of the slowest prompt rather than
+    the sum of all of them.
+
+    Args:
+        request: The batch UI generation request
+
+    Returns:
+        Generated UI layouts, one per prompt in input order
+    """
+    try:
+        results = await generate_ui_from_prompts(request.prompts)
+
+        return {"results": [_to_response(result) for result in results]}
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error generating UI layouts: {str(e)}"
+        )
+
+@app.post("/generate/stream")
+async def generate_ui_stream(request: UIRequest) -> StreamingResponse:
+    """Stream the generated layout as server-sent events.
+
+    Instead of blocking until the full layout JSON is generated, forward
+    each model chunk to the client as it arrives so the perceived latency
+    is the time to first token.
+
+    Args:
+        request: The UI generation request
+
+    Returns:
+        Server-sent event stream of layout JSON chunks
+    """
+    async def event_stream():
+        async for chunk in llm_provider.astream_ui_layout(request.prompt):
+            yield f"data: {orjson.dumps({'delta': chunk}).decode()}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 @app.get("/health")
 async def health_check() -> Dict[str, str]:
     """Health check endpoint."""
@@ -77,8 +146,7 @@ async def health_check() -> Dict[str, str]:
 def start_server():
     """Start the API server."""
     import uvicorn
-    import sys
-    import os
+
     # Add the project root to Python path
     root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     sys.path.insert(0, root_dir)
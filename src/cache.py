@@ -0,0 +1,64 @@
+"""Response cache for the AI Agent.
+
+This module caches generated UI layouts so repeated prompts can be
+served without re-running the full LLM workflow.
+"""
+
+import hashlib
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Optional
+
+from config import config
+
+
+class ResponseCache:
+    """LRU cache for generated results keyed by a hash of the prompt."""
+
+    def __init__(self, maxsize: int = 512):
+        """Initialize an empty cache holding at most maxsize entries."""
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = Lock()
+
+    def is_enabled(self) -> bool:
+        """Check whether caching is safe for the current configuration.
+
+        Reusing responses only makes sense when generation is close to
+        deterministic, so the cache is bypassed at higher temperatures.
+        """
+        return config.llm.temperature <= 0.3
+
+    @staticmethod
+    def _key(prompt: str) -> str:
+        """Compute the cache key for a prompt."""
+        return hashlib.sha256(prompt.encode()).hexdigest()
+
+    def get(self, prompt: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result for a prompt, or None on a miss."""
+        if not self.is_enabled():
+            return None
+
+        key = self._key(prompt)
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                # Refresh recency so frequently repeated prompts stay cached
+                self._entries.move_to_end(key)
+            return result
+
+    def put(self, prompt: str, result: Dict[str, Any]) -> None:
+        """Store the result for a prompt, evicting the oldest entry if full."""
+        if not self.is_enabled():
+            return
+
+        key = self._key(prompt)
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+# Create a global instance of the response cache
+response_cache = ResponseCache()
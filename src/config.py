@@ -9,36 +9,47 @@ from pathlib import Path
 from typing import Optional
 
 from dotenv import load_dotenv
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Read the environment once at import; the config models below are frozen,
+# so re-instantiating them (tests, worker processes) never re-hits os.getenv
+_FIGMA_ACCESS_TOKEN = os.getenv("FIGMA_ACCESS_TOKEN")
+_FIGMA_FILE_KEY = os.getenv("FIGMA_FILE_KEY")
+_LLM_API_KEY = os.getenv("DEEPSEEK_API_KEY") or os.getenv("OPENAI_API_KEY")
+_DEBUG_MODE = os.getenv("DEBUG_MODE", "false").lower() == "true"
+
 class FigmaConfig(BaseModel):
     """Configuration for Figma API integration."""
 
+    model_config = ConfigDict(frozen=True)
+
     access_token: Optional[str] = Field(
-        default_factory=lambda: os.getenv("FIGMA_ACCESS_TOKEN"),
+        default=_FIGMA_ACCESS_TOKEN,
         description="Figma API access token"
     )
     file_key: Optional[str] = Field(
-        default_factory=lambda: os.getenv("FIGMA_FILE_KEY"),
+        default=_FIGMA_FILE_KEY,
         description="Figma file key to update"
     )
     enabled: bool = Field(
-        default_factory=lambda: bool(os.getenv("FIGMA_ACCESS_TOKEN")),
+        default=bool(_FIGMA_ACCESS_TOKEN),
         description="Whether Figma integration is enabled"
     )
 
 class LLMConfig(BaseModel):
     """Configuration for the language model."""
 
+    model_config = ConfigDict(frozen=True)
+
     model_name: str = Field(
         default="deepseek",
         description="LLM model to use (deepseek or openai)"
     )
     api_key: Optional[str] = Field(
-        default_factory=lambda: os.getenv("DEEPSEEK_API_KEY") or os.getenv("OPENAI_API_KEY"),
+        default=_LLM_API_KEY,
         description="API key for the LLM service"
     )
     temperature: float = Field(
@@ -46,15 +57,17 @@ class LLMConfig(BaseModel):
         description="Temperature for model generation"
     )
     max_tokens: int = Field(
-        default=1024,
+        default=4096,
         description="Maximum tokens for model generation"
     )
 
 class AgentConfig(BaseModel):
     """Configuration for the AI Agent."""
 
+    model_config = ConfigDict(frozen=True)
+
     debug: bool = Field(
-        default_factory=lambda: os.getenv("DEBUG_MODE", "false").lower() == "true",
+        default=_DEBUG_MODE,
         description="Whether to enable debug mode"
     )
     project_root: Path = Field(
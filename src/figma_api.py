@@ -4,9 +4,10 @@ This module handles the integration with the Figma API,
 allowing the agent to create and update designs in a Figma file.
 """
 
-import json
+import functools
 from typing import Any, Dict, List, Optional
 
+import orjson
 import requests
 
 from config import config
@@ -25,6 +26,13 @@ class FigmaAPI:
             "Content-Type": "application/json"
         }
 
+        # Reuse one pooled session so keep-alive connections skip the
+        # TCP+TLS handshake on every call
+        self._session = requests.Session()
+        self._session.headers.update(self.headers)
+        adapter = requests.adapters.HTTPAdapter(pool_connections=10, pool_maxsize=32)
+        self._session.mount("https://", adapter)
+
     def is_enabled(self) -> bool:
         """Check if the Figma integration is enabled."""
         return config.figma.enabled
@@ -35,7 +43,7 @@ class FigmaAPI:
             return {"error": "Figma integration not enabled"}
 
         url = f"{self.base_url}/files/{self.file_key}"
-        response = requests.get(url, headers=self.headers)
+        response = self._session.get(url)
 
         if response.status_code == 200:
             return response.json()
@@ -70,7 +78,7 @@ class FigmaAPI:
         # for a full-featured integration
 
         if config.debug:
-            print(f"Would create Figma frame with data: {json.dumps(figma_nodes, indent=2)}")
+            print(f"Would create Figma frame with data: {orjson.dumps(figma_nodes, option=orjson.OPT_INDENT_2).decode()}")
             return {"status": "debug_mode", "nodes": figma_nodes}
 
         # In non-debug mode, we'd make the actual API call
@@ -92,8 +100,22 @@ class FigmaAPI:
         # This is a placeholder for the actual conversion logic
         # A full implementation would map our properties to Figma's API structure
 
-        def convert_node(node):
-            """Recursively convert a node and its children."""
+        # Traverse iteratively with an explicit stack instead of recursing,
+        # so deeply nested layouts avoid Python frame overhead and can't
+        # hit RecursionError. First pass enumerates nodes top-down; second
+        # pass builds Figma nodes bottom-up so children exist before their
+        # parent references them.
+        order = []
+        stack = [layout_data]
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            children = node.get("children")
+            if isinstance(children, list):
+                stack.extend(children)
+
+        converted: Dict[int, Dict[str, Any]] = {}
+        for node in reversed(order):
             figma_node = {
                 "name": node.get("name", "Unnamed"),
                 "type": node.get("type", "FRAME"),
@@ -115,21 +137,37 @@ class FigmaAPI:
                 }
             }
 
-            if "children" in node and isinstance(node["children"], list):
-                figma_node["children"] = [convert_node(child) for child in node["children"]]
+            children = node.get("children")
+            if isinstance(children, list):
+                figma_node["children"] = [converted[id(child)] for child in children]
 
-            return figma_node
+            converted[id(node)] = figma_node
 
-        return convert_node(layout_data)
+        return converted[id(layout_data)]
 
     @staticmethod
+    @functools.lru_cache(maxsize=256)
     def _hex_to_rgb(hex_color: str) -> Dict[str, float]:
-        """Convert hex color string to RGB dict with normalized values."""
-        hex_color = hex_color.lstrip('#')
+        """Convert hex color string to RGB dict with normalized values.
+
+        Accepts 6-digit hex and 3-digit shorthand (e.g. "#FFF"), which
+        LLM-produced layouts do emit; other lengths raise ValueError.
+        Layouts repeat the same handful of colors across many nodes, so
+        the result is memoized; a single int parse plus bit shifts
+        replaces three separate substring parses.
+        """
+        digits = hex_color.lstrip('#')
+        if len(digits) == 3:
+            # Expand shorthand: each digit doubles ("FFF" -> "FFFFFF")
+            digits = ''.join(c * 2 for c in digits)
+        elif len(digits) != 6:
+            raise ValueError(f"Invalid hex color: {hex_color!r}")
+
+        value = int(digits, 16)
         return {
-            "r": int(hex_color[0:2], 16) / 255.0,
-            "g": int(hex_color[2:4], 16) / 255.0,
-            "b": int(hex_color[4:6], 16) / 255.0
+            "r": ((value >> 16) & 0xFF) / 255.0,
+            "g": ((value >> 8) & 0xFF) / 255.0,
+            "b": (value & 0xFF) / 255.0
         }
 
 
@@ -4,21 +4,99 @@ This module handles interactions with language models,
 with primary support for DeepSeek and fallback to OpenAI.
 """
 
-from typing import Dict, List, Optional, Any, Union
+import asyncio
+import os
+from typing import AsyncIterator, Dict, List, Optional, Any, Union
 
+import httpx
 from langchain_core.language_models import BaseLLM
-from langchain_core.prompts import ChatPromptTemplate
 from langchain_deepseek import ChatDeepSeek
+from pydantic import BaseModel, ConfigDict, Field
 
 
 from config import config
 
+# Cap in-flight LLM work to the provider's per-key concurrency quota.
+# Acquired around every async model call, so bursts queue client-side
+# regardless of which endpoint or batch they arrived through.
+llm_semaphore = asyncio.Semaphore(int(os.getenv("LLM_CONCURRENCY", "16")))
+
+# Static layout-generation instructions, defined once at import. The schema
+# example and directives lead so the provider's prompt-prefix cache gets a
+# stable prefix; only the trailing description varies per call. Plain string
+# composition (not ChatPromptTemplate) so the literal braces in the JSON
+# example need no escaping and no template parsing runs per call.
+_LAYOUT_PROMPT_PREFIX = """You are a UI/UX expert specializing in creating Figma-compatible designs.
+Convert the natural language description at the end into a structured JSON format representing the described UI layout: hierarchical (parent and child components), with styling information (colors, spacing, fonts), using standard Figma component terminology, and parseable as valid JSON.
+
+OUTPUT FORMAT EXAMPLE:
+```json
+{
+  "name": "Dashboard Layout",
+  "type": "FRAME",
+  "width": 1440,
+  "height": 900,
+  "backgroundColor": "#FFFFFF",
+  "children": [
+    {
+      "name": "Sidebar",
+      "type": "RECTANGLE",
+      "x": 0,
+      "y": 0,
+      "width": 250,
+      "height": 900,
+      "backgroundColor": "#F5F5F5",
+      "children": [...]
+    },
+    {
+      "name": "Content Area",
+      "type": "FRAME",
+      "x": 250,
+      "y": 0,
+      "width": 1190,
+      "height": 900,
+      "backgroundColor": "#FFFFFF",
+      "children": [...]
+    }
+  ]
+}
+```
+
+Respond with only the JSON, no explanations or other text.
+
+DESCRIPTION:
+"""
+
+
+class FigmaComponent(BaseModel):
+    """Schema for a Figma layout component, mirroring the prompt example.
+
+    Used with the model's structured-output mode so the decoder is
+    constrained to this shape and invalid JSON cannot occur.
+    """
+
+    model_config = ConfigDict(extra="allow")
+
+    name: str = "Component"
+    type: str = "FRAME"
+    x: Optional[float] = None
+    y: Optional[float] = None
+    width: Optional[float] = None
+    height: Optional[float] = None
+    backgroundColor: Optional[str] = None
+    children: List["FigmaComponent"] = Field(default_factory=list)
+
+
 class LLMProvider:
     """Provider class for language model interactions."""
 
     def __init__(self):
         """Initialize the LLM provider with configuration."""
         self.llm = self._init_llm()
+        # Built once; include_raw keeps the AIMessage for cache-usage logging
+        self.structured_llm = self.llm.with_structured_output(
+            FigmaComponent, include_raw=True
+        )
 
     def _init_llm(self) -> BaseLLM:
         """Initialize the appropriate language model based on config."""
@@ -27,12 +105,16 @@ class LLMProvider:
             # Try importing the DeepSeek integration
             # If not available, this will raise ImportError
 
-            print("config.llm.api_key:", config.llm.api_key)
+            # Hand the client pooled keep-alive transports so repeated
+            # calls reuse connections instead of re-running TLS bootstrap
+            limits = httpx.Limits(max_keepalive_connections=20)
             return ChatDeepSeek(
                 model=config.llm.model_name,
                 api_key=config.llm.api_key,
                 temperature=config.llm.temperature,
                 max_tokens=config.llm.max_tokens,
+                http_client=httpx.Client(limits=limits),
+                http_async_client=httpx.AsyncClient(limits=limits),
             )
         except ImportError:
             if config.debug:
@@ -40,99 +122,84 @@ class LLMProvider:
 
 
 
-    def generate_ui_layout(self, prompt: str) -> Dict[str, Any]:
-        """Generate UI layout based on the prompt.
+    async def warmup(self) -> None:
+        """Issue a tiny request to prime the connection and provider caches.
 
-        Args:
-            prompt: Natural language description of the UI layout
+        The first real request would otherwise pay the TLS handshake and
+        provider cold-start cost; a 1-token call at startup absorbs it.
+        Uses ainvoke so the async transport — the one every serving path
+        (ainvoke in the agent, astream_ui_layout) goes through — is the
+        client that gets warmed.
+        """
+        try:
+            await self.llm.ainvoke("ping", max_tokens=1)
+        except Exception as e:
+            if config.debug:
+                print(f"LLM warmup failed: {e}")
 
-        Returns:
-            Dictionary containing the structured layout representation
+    @staticmethod
+    def log_cache_usage(result: Any) -> None:
+        """Log prompt-prefix cache usage for a model response in debug mode.
+
+        DeepSeek reports how many prompt tokens were served from its context
+        cache; logging them lets us verify the cacheable prefix is stable.
         """
-        layout_prompt = ChatPromptTemplate.from_template(
-            """
-            You are a UI/UX expert specializing in creating Figma-compatible designs.
-            Convert the following natural language description into a structured JSON
-            format that represents the described UI layout.
-
-            Requirements:
-            1. The layout should be hierarchical, with parent and child components
-            2. Include appropriate styling information (colors, spacing, fonts)
-            3. Use standard Figma component terminology where possible
-            4. Format must be valid JSON that can be parsed programmatically
-
-            DESCRIPTION:
-            {prompt}
-
-            OUTPUT FORMAT EXAMPLE:
-            ```json
-            {
-              "name": "Dashboard Layout",
-              "type": "FRAME",
-              "width": 1440,
-              "height": 900,
-              "backgroundColor": "#FFFFFF",
-              "children": [
-                {
-                  "name": "Sidebar",
-                  "type": "RECTANGLE",
-                  "x": 0,
-                  "y": 0,
-                  "width": 250,
-                  "height": 900,
-                  "backgroundColor": "#F5F5F5",
-                  "children": [...]
-                },
-                {
-                  "name": "Content Area",
-                  "type": "FRAME",
-                  "x": 250,
-                  "y": 0,
-                  "width": 1190,
-                  "height": 900,
-                  "backgroundColor": "#FFFFFF",
-                  "children": [...]
-                }
-              ]
-            }
-            ```
-
-            Respond with only the JSON, no explanations or other text.
-            """
-        )
+        if not config.debug:
+            return
 
-        # Generate the UI layout using the LLM
-        result = self.llm.invoke(
-            layout_prompt.format(prompt=prompt)
-        )
+        usage = getattr(result, "response_metadata", {}).get("token_usage", {})
+        hit = usage.get("prompt_cache_hit_tokens")
+        miss = usage.get("prompt_cache_miss_tokens")
+        if hit is not None or miss is not None:
+            print(f"Prompt cache: {hit} tokens hit, {miss} tokens miss")
 
-        # Extract the JSON content from the response
-        import json
-        import re
+    def _format_layout_prompt(self, prompt: str) -> str:
+        """Build the full layout-generation prompt for a description."""
+        return f"{_LAYOUT_PROMPT_PREFIX}{prompt}\n"
 
-        content = result.content
+    async def astream_ui_layout(self, prompt: str) -> AsyncIterator[str]:
+        """Stream the UI layout generation token-by-token.
 
-        # Extract JSON content between ```json and ``` if present
-        json_pattern = r'```json\s*([\s\S]*?)\s*```'
-        json_match = re.search(json_pattern, content)
+        Holds an llm_semaphore permit for the duration of the stream so
+        streaming calls count against the same concurrency budget as
+        regular generation.
 
-        if json_match:
-            json_str = json_match.group(1)
-        else:
-            # If no code block markers, try to use the entire content
-            json_str = content
+        Args:
+            prompt: Natural language description of the UI layout
 
-        try:
-            # Parse the JSON string into a Python dictionary
-            layout_data = json.loads(json_str)
-            return layout_data
-        except json.JSONDecodeError as e:
+        Yields:
+            Text chunks of the model's response as they arrive
+        """
+        async with llm_semaphore:
+            async for chunk in self.llm.astream(self._format_layout_prompt(prompt)):
+                if chunk.content:
+                    yield chunk.content
+
+    def generate_ui_layout(self, prompt: str) -> Dict[str, Any]:
+        """Generate UI layout based on the prompt.
+
+        Args:
+            prompt: Natural language description of the UI layout
+
+        Returns:
+            Dictionary containing the structured layout representation
+        """
+        # Schema-constrained decoding: the model returns a parsed
+        # FigmaComponent directly, so malformed JSON and code-fence
+        # extraction are no longer possible failure modes.
+        result = self.structured_llm.invoke(self._format_layout_prompt(prompt))
+        self.log_cache_usage(result["raw"])
+
+        layout = result["parsed"]
+        if layout is None:
+            error = result.get("parsing_error")
             if config.debug:
-                print(f"Error parsing JSON response: {e}")
-                print(f"Raw content: {content}")
+                print(f"Error parsing structured layout: {error}")
 
             # Return a minimal error response
-            return {"error": "Failed to parse layout", "message": str(e)}
+            return {"error": "Failed to parse layout", "message": str(error)}
+
+        return layout.model_dump(exclude_none=True)
 
 
 # Create a global instance of the LLM provider
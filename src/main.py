@@ -3,13 +3,16 @@
 This module provides the main entry point and API for the AI agent.
 """
 
-import json
+import argparse
+import asyncio
 from typing import Any, Dict, Optional
 
+import orjson
+
 from agent import generate_ui_from_prompt
 
 
-def generate_ui_layout(prompt: str, output_json: bool = False) -> Dict[str, Any]:
+async def generate_ui_layout(prompt: str, output_json: bool = False) -> Dict[str, Any]:
     """Generate a UI layout from a natural language prompt.
 
     Args:
@@ -20,26 +23,16 @@ def generate_ui_layout(prompt: str, output_json: bool = False) -> Dict[str, Any]
         Dictionary or JSON string with generated layout
     """
     # Use our agent to generate the UI layout
-    result = generate_ui_from_prompt(prompt)
+    result = await generate_ui_from_prompt(prompt)
 
     if output_json:
-        return json.dumps(result, indent=2)
+        return orjson.dumps(result, option=orjson.OPT_INDENT_2).decode()
 
     return result
 
 
-def main():
-    """Command-line entry point for the application."""
-    import argparse
-
-    # Parse command-line arguments
-    parser = argparse.ArgumentParser(description="Generate UI layouts from natural language prompts")
-    parser.add_argument("prompt", nargs="?", help="Natural language prompt describing the UI layout")
-    parser.add_argument("--json", action="store_true", help="Output result as JSON")
-    parser.add_argument("--output", "-o", help="Output file path to save the result")
-
-    args = parser.parse_args()
-
+async def _run(args) -> None:
+    """Execute the CLI flow under a single event loop."""
     # If no prompt is provided, enter interactive mode
     if not args.prompt:
         print("Enter a prompt describing the UI layout you want to generate.")
@@ -56,21 +49,21 @@ def main():
 
             # Generate UI layout
             try:
-                result = generate_ui_layout(prompt, args.json)
+                result = await generate_ui_layout(prompt, args.json)
 
                 if args.output:
                     with open(args.output, "w") as f:
                         if args.json:
                             f.write(result)
                         else:
-                            f.write(json.dumps(result, indent=2))
+                            f.write(orjson.dumps(result, option=orjson.OPT_INDENT_2).decode())
                     print(f"Result saved to {args.output}")
                 else:
                     if args.json:
                         print(result)
                     else:
                         print("\nGENERATED LAYOUT:")
-                        print(json.dumps(result["layout"], indent=2))
+                        print(orjson.dumps(result["layout"], option=orjson.OPT_INDENT_2).decode())
 
                         if result.get("errors"):
                             print("\nERRORS:")
@@ -81,21 +74,21 @@ def main():
     else:
         # Process a single prompt
         try:
-            result = generate_ui_layout(args.prompt, args.json)
+            result = await generate_ui_layout(args.prompt, args.json)
 
             if args.output:
                 with open(args.output, "w") as f:
                     if args.json:
                         f.write(result)
                     else:
-                        f.write(json.dumps(result, indent=2))
+                        f.write(orjson.dumps(result, option=orjson.OPT_INDENT_2).decode())
                 print(f"Result saved to {args.output}")
             else:
                 if args.json:
                     print(result)
                 else:
                     print("\nGENERATED LAYOUT:")
-                    print(json.dumps(result["layout"], indent=2))
+                    print(orjson.dumps(result["layout"], option=orjson.OPT_INDENT_2).decode())
 
                     if result.get("errors"):
                         print("\nERRORS:")
@@ -105,5 +98,22 @@ def main():
             print(f"Error: {str(e)}")
 
 
+def main():
+    """Command-line entry point for the application."""
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(description="Generate UI layouts from natural language prompts")
+    parser.add_argument("prompt", nargs="?", help="Natural language prompt describing the UI layout")
+    parser.add_argument("--json", action="store_true", help="Output result as JSON")
+    parser.add_argument("--output", "-o", help="Output file path to save the result")
+
+    args = parser.parse_args()
+
+    # One event loop for the whole session: the LLM client's pooled async
+    # connections are bound to the loop they were opened under, so a fresh
+    # asyncio.run per prompt would hand keep-alive connections from a
+    # closed loop to the next one and fail with "Event loop is closed"
+    asyncio.run(_run(args))
+
+
 if __name__ == "__main__":
     main()